@@ -5,25 +5,17 @@ https://opensource.org/licenses/mit-license.php
 
 """
 
+import contextlib
 import os
 import traceback
-from typing import Any, Set, cast
+from typing import Any, Dict, List, Set, Tuple, cast
 
 import bpy
 from bpy.app.handlers import persistent
 from bpy_extras.io_utils import ExportHelper, ImportHelper
 
 from . import vrm_types
-from .importer import blend_model, vrm_load
-from .misc import (
-    detail_mesh_maker,
-    glb_factory,
-    glsl_drawer,
-    make_armature,
-    mesh_from_bone_envelopes,
-    version,
-    vrm_helper,
-)
+from .misc import glsl_drawer, make_armature, version, vrm_helper
 from .misc.glsl_drawer import GlslDrawObj
 from .misc.preferences import get_preferences
 
@@ -54,6 +46,22 @@ class LicenseConfirmation(bpy.types.PropertyGroup):  # type: ignore[misc]
     json_key: bpy.props.StringProperty()  # type: ignore[valid-type]
 
 
+# The environment variable is set by the launcher before Blender starts.
+automatic_license_confirmation = (
+    os.environ.get("BLENDER_VRM_AUTOMATIC_LICENSE_CONFIRMATION") == "true"
+)
+
+# The VRM parsed before the license confirmation dialog is shown.
+# It holds one VRM at most and is keyed by license_confirmation_vrm_cache_key().
+license_confirmation_vrm_cache: Dict[
+    Tuple[str, float], Tuple[vrm_types.VrmPydata, bytes]
+] = {}
+
+
+def license_confirmation_vrm_cache_key(filepath: str) -> Tuple[str, float]:
+    return (os.path.abspath(filepath), os.path.getmtime(filepath))
+
+
 class ImportVRM(bpy.types.Operator, ImportHelper):  # type: ignore[misc]
     bl_idname = "import_scene.vrm"
     bl_label = "Import VRM"
@@ -88,6 +96,9 @@ class ImportVRM(bpy.types.Operator, ImportHelper):  # type: ignore[misc]
     )
 
     def execute(self, context: bpy.types.Context) -> Set[str]:
+        # Lazy import to minimize add-on initialization
+        from .importer import vrm_load
+
         license_error = None
         try:
             return create_blend_model(
@@ -106,9 +117,18 @@ class ImportVRM(bpy.types.Operator, ImportHelper):  # type: ignore[misc]
 
         print(license_error.description())
 
+        license_confirmation_vrm_cache.clear()
+        if (
+            license_error.vrm_pydata is not None
+            and license_error.body_binary is not None
+        ):
+            license_confirmation_vrm_cache[
+                license_confirmation_vrm_cache_key(self.filepath)
+            ] = (license_error.vrm_pydata, license_error.body_binary)
+
         execution_context = "INVOKE_DEFAULT"
         import_anyway = False
-        if os.environ.get("BLENDER_VRM_AUTOMATIC_LICENSE_CONFIRMATION") == "true":
+        if automatic_license_confirmation:
             execution_context = "EXEC_DEFAULT"
             import_anyway = True
 
@@ -133,10 +153,18 @@ class ImportVRM(bpy.types.Operator, ImportHelper):  # type: ignore[misc]
 def create_blend_model(
     addon: Any, context: bpy.types.Context, vrm_pydata: vrm_types.VrmPydata
 ) -> Set[str]:
+    # Lazy import to minimize add-on initialization
+    from .importer import blend_model
+
     has_ui_localization = bpy.app.version < (2, 83)
     ui_localization = False
     if has_ui_localization:
         ui_localization = bpy.context.preferences.view.use_international_fonts
+
+    # Don't run depsgraph_update_post handlers for every intermediate update.
+    # The view layer is updated only once after the model is built.
+    depsgraph_update_post_handlers = list(bpy.app.handlers.depsgraph_update_post)
+    bpy.app.handlers.depsgraph_update_post.clear()
     try:
         blend_model.BlendModel(
             context,
@@ -150,9 +178,13 @@ def create_blend_model(
             addon.set_bone_roll,
         )
     finally:
+        for handler in depsgraph_update_post_handlers:
+            if handler not in bpy.app.handlers.depsgraph_update_post:
+                bpy.app.handlers.depsgraph_update_post.append(handler)
         if has_ui_localization and ui_localization:
             bpy.context.preferences.view.use_international_fonts = ui_localization
 
+    context.view_layer.update()
     return {"FINISHED"}
 
 
@@ -174,12 +206,12 @@ def export_vrm_update_addon_preferences(
     preferences = get_preferences(context)
     if not preferences:
         return
-    if bool(preferences.export_invisibles) != bool(export_op.export_invisibles):
-        preferences.export_invisibles = export_op.export_invisibles
-    if bool(preferences.export_only_selections) != bool(
-        export_op.export_only_selections
-    ):
-        preferences.export_only_selections = export_op.export_only_selections
+    export_invisibles = export_op.export_invisibles
+    if preferences.export_invisibles != export_invisibles:
+        preferences.export_invisibles = export_invisibles
+    export_only_selections = export_op.export_only_selections
+    if preferences.export_only_selections != export_only_selections:
+        preferences.export_only_selections = export_only_selections
 
 
 class ExportVRM(bpy.types.Operator, ExportHelper):  # type: ignore[misc]
@@ -210,6 +242,9 @@ class ExportVRM(bpy.types.Operator, ExportHelper):  # type: ignore[misc]
             return {"CANCELLED"}
         filepath: str = self.filepath
 
+        # Lazy import to minimize add-on initialization
+        from .misc import glb_factory
+
         try:
             glb_obj = glb_factory.GlbObj(
                 bool(self.export_invisibles), bool(self.export_only_selections)
@@ -220,8 +255,20 @@ class ExportVRM(bpy.types.Operator, ExportHelper):  # type: ignore[misc]
         vrm_bin = glb_obj.convert_bpy2glb("0.0")
         if vrm_bin is None:
             return {"CANCELLED"}
-        with open(filepath, "wb") as f:
-            f.write(vrm_bin)
+
+        # Write the whole binary without Python's buffered IO layer
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        fd = os.open(filepath, flags, 0o666)
+        try:
+            view = memoryview(vrm_bin)
+            offset = 0
+            while offset < len(view):
+                offset += os.write(fd, view[offset : offset + (1 << 20)])
+            if hasattr(os, "posix_fadvise"):
+                # The exported file won't be read again soon; release the page cache
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
         return {"FINISHED"}
 
     def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[str]:
@@ -278,6 +325,9 @@ def add_armature(
 
 
 def make_mesh(make_mesh_op: bpy.types.Operator, context: bpy.types.Context) -> None:
+    # Lazy import to minimize add-on initialization
+    from .misc import detail_mesh_maker, mesh_from_bone_envelopes
+
     make_mesh_op.layout.separator()
     make_mesh_op.layout.operator(
         mesh_from_bone_envelopes.ICYP_OT_MAKE_MESH_FROM_BONE_ENVELOPES.bl_idname,
@@ -291,6 +341,16 @@ def make_mesh(make_mesh_op: bpy.types.Operator, context: bpy.types.Context) -> N
     )
 
 
+# (bone name, custom property data path, add button text) for armature_ui()
+human_bone_requires_ui = tuple(
+    (req, f'["{req}"]', f"Add {req} property") for req in vrm_types.HumanBones.requires
+)
+human_bone_defines_ui = tuple(
+    (defs, f'["{defs}"]', f"Add {defs} property")
+    for defs in vrm_types.HumanBones.defines
+)
+
+
 class VRM_IMPORTER_PT_controller(bpy.types.Panel):  # type: ignore[misc] # noqa: N801
     bl_idname = "ICYP_PT_ui_controller"
     bl_label = "VRM Helper"
@@ -304,6 +364,9 @@ class VRM_IMPORTER_PT_controller(bpy.types.Panel):  # type: ignore[misc] # noqa:
         return True
 
     def draw(self, context: bpy.types.Context) -> None:
+        mode = context.mode
+        active_object = context.active_object
+
         # region helper
         def armature_ui() -> None:
             self.layout.separator()
@@ -312,38 +375,40 @@ class VRM_IMPORTER_PT_controller(bpy.types.Panel):  # type: ignore[misc] # noqa:
             armature_box.operator(vrm_helper.Add_VRM_extensions_to_armature.bl_idname)
             self.layout.separator()
 
+            armature_data = active_object.data
+
             requires_box = armature_box.box()
             requires_row = requires_box.row()
             requires_row.label(text="VRM Required Bones")
-            for req in vrm_types.HumanBones.requires:
-                if req in context.active_object.data:
+            for req, req_path, req_add_text in human_bone_requires_ui:
+                if req in armature_data:
                     requires_box.prop_search(
-                        context.active_object.data,
-                        f'["{req}"]',
-                        context.active_object.data,
+                        armature_data,
+                        req_path,
+                        armature_data,
                         "bones",
                         text=req,
                     )
                 else:
                     requires_box.operator(
                         vrm_helper.Add_VRM_require_humanbone_custom_property.bl_idname,
-                        text=f"Add {req} property",
+                        text=req_add_text,
                     )
             defines_box = armature_box.box()
             defines_box.label(text="VRM Optional Bones")
-            for defs in vrm_types.HumanBones.defines:
-                if defs in context.active_object.data:
+            for defs, defs_path, defs_add_text in human_bone_defines_ui:
+                if defs in armature_data:
                     defines_box.prop_search(
-                        context.active_object.data,
-                        f'["{defs}"]',
-                        context.active_object.data,
+                        armature_data,
+                        defs_path,
+                        armature_data,
                         "bones",
                         text=defs,
                     )
                 else:
                     defines_box.operator(
                         vrm_helper.Add_VRM_defined_humanbone_custom_property.bl_idname,
-                        text=f"Add {defs} property",
+                        text=defs_add_text,
                     )
 
             armature_box.label(icon="ERROR", text="EXPERIMENTAL!!!")
@@ -352,18 +417,14 @@ class VRM_IMPORTER_PT_controller(bpy.types.Panel):  # type: ignore[misc] # noqa:
         # endregion helper
 
         # region draw_main
-        if (
-            context.mode != "POSE"
-            or context.active_object is None
-            or context.active_object.type != "ARMATURE"
-        ):
+        if mode != "POSE" or active_object is None or active_object.type != "ARMATURE":
             self.layout.label(text="If you select armature in object mode")
             self.layout.label(text="armature renamer is shown")
-        if context.mode != "EDIT_MESH":
+        if mode != "EDIT_MESH":
             self.layout.label(text="If you in MESH EDIT")
             self.layout.label(text="symmetry button is shown")
             self.layout.label(text="*Symmetry is in default blender function")
-        if context.mode == "OBJECT":
+        if mode == "OBJECT":
             object_mode_box = self.layout.box()
             preferences = get_preferences(context)
             if preferences:
@@ -388,33 +449,33 @@ class VRM_IMPORTER_PT_controller(bpy.types.Panel):  # type: ignore[misc] # noqa:
             vrm_validator_prop.show_successful_message = True
             # vrm_validator_prop.errors = []  # これはできない
             object_mode_box.label(text="MToon preview")
-            if [obj for obj in bpy.data.objects if obj.type == "LIGHT"]:
+            # Scan bpy.data.lights instead of bpy.data.objects that can be huge.
+            # A light data is used by light objects only.
+            if any(light.users for light in bpy.data.lights):
                 object_mode_box.operator(glsl_drawer.ICYP_OT_Draw_Model.bl_idname)
             else:
                 object_mode_box.box().label(
                     icon="INFO",
                     text=vrm_helper.lang_support("A light is required", "ライトが必要です"),
                 )
-            if GlslDrawObj.draw_objs:
+            if GlslDrawObj.active_count:
                 object_mode_box.operator(
                     glsl_drawer.ICYP_OT_Remove_Draw_Model.bl_idname
                 )
-            if context.active_object is not None:
-                if context.active_object.type == "ARMATURE":
+            if active_object is not None:
+                if active_object.type == "ARMATURE":
                     armature_ui()
-                if context.active_object.type == "MESH":
+                elif active_object.type == "MESH":
                     self.layout.label(icon="ERROR", text="EXPERIMENTAL!!!")
                     self.layout.operator(
                         vrm_helper.Vroid2VRC_lipsync_from_json_recipe.bl_idname
                     )
-
-        if context.mode == "EDIT_MESH":
+        elif mode == "EDIT_MESH":
             self.layout.operator(bpy.ops.mesh.symmetry_snap.idname_py())
-
-        if (
-            context.mode == "POSE"
-            and context.active_object is not None  # Noneになることは有り得ないかもしれない
-            and context.active_object.type == "ARMATURE"
+        elif (
+            mode == "POSE"
+            and active_object is not None  # Noneになることは有り得ないかもしれない
+            and active_object.type == "ARMATURE"
         ):
             armature_ui()
         # endregion draw_main
@@ -440,24 +501,47 @@ class WM_OT_licenseConfirmation(bpy.types.Operator):  # type: ignore[misc] # noq
 
     def execute(self, context: bpy.types.Context) -> Set[str]:
         if not self.import_anyway:
+            license_confirmation_vrm_cache.clear()
             return {"CANCELLED"}
-        return create_blend_model(
-            self,
-            context,
-            vrm_load.read_vrm(
+
+        parsed_vrm = None
+        # If the file was moved or deleted, treat it as a cache miss
+        with contextlib.suppress(OSError):
+            parsed_vrm = license_confirmation_vrm_cache.get(
+                license_confirmation_vrm_cache_key(self.filepath)
+            )
+        license_confirmation_vrm_cache.clear()
+
+        # Lazy import to minimize add-on initialization
+        from .importer import vrm_load
+
+        if parsed_vrm is None:
+            vrm_pydata = vrm_load.read_vrm(
                 self.filepath,
                 self.extract_textures_into_folder,
                 self.make_new_texture_folder,
                 self.use_simple_principled_material,
                 license_check=False,
-            ),
-        )
+            )
+        else:
+            vrm_pydata = vrm_load.read_parsed_vrm(
+                *parsed_vrm,
+                self.extract_textures_into_folder,
+                self.make_new_texture_folder,
+                self.use_simple_principled_material,
+                license_check=False,
+            )
+        return create_blend_model(self, context, vrm_pydata)
 
     def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[str]:
         return cast(
             Set[str], context.window_manager.invoke_props_dialog(self, width=600)
         )
 
+    def cancel(self, context: bpy.types.Context) -> None:
+        # The dialog was dismissed without OK, so execute() will never use it
+        license_confirmation_vrm_cache.clear()
+
     def draw(self, context: bpy.types.Context) -> None:
         layout = self.layout
         layout.label(text=self.filepath)
@@ -484,17 +568,27 @@ class WM_OT_licenseConfirmation(bpy.types.Operator):  # type: ignore[misc] # noq
         )
 
 
+# Node groups stored in resources/material_node_groups.blend
+material_node_group_names = frozenset(
+    ["GLTF", "MToon_unversioned", "TRANSPARENT_ZWRITE", "matcap_vector"]
+)
+
 if persistent:  # for fake-bpy-modules
 
     @persistent  # type: ignore[misc]
     def add_shaders(self: Any) -> None:
+        missing_node_group_names = material_node_group_names - set(
+            bpy.data.node_groups.keys()
+        )
+        if not missing_node_group_names:
+            return
         filedir = os.path.join(
             os.path.dirname(__file__), "resources", "material_node_groups.blend"
         )
         with bpy.data.libraries.load(filedir, link=False) as (data_from, data_to):
-            for nt in data_from.node_groups:
-                if nt not in bpy.data.node_groups:
-                    data_to.node_groups.append(nt)
+            data_to.node_groups = [
+                nt for nt in data_from.node_groups if nt in missing_node_group_names
+            ]
 
 
 classes = [
@@ -520,6 +614,8 @@ classes = [
     # mesh_from_bone_envelopes.ICYP_OT_MAKE_MESH_FROM_BONE_ENVELOPES
 ]
 
+# bpy.app.translations.register() copies this into Blender's own message table.
+# UI translation never hashes these Python strings, so they are kept as plain literals.
 translation_dictionary = {
     "ja_JP": {
         ("*", "Export invisible objects"): "非表示のオブジェクトも含める",
@@ -557,13 +653,18 @@ def unregister() -> None:
     # bpy.types.VIEW3D_MT_mesh_add.remove(make_mesh)
     bpy.types.TOPBAR_MT_file_import.remove(menu_export)
     bpy.types.TOPBAR_MT_file_export.remove(menu_import)
-    errors = []
-    for cls in classes:
+    # The traceback is formatted only when something actually failed
+    errors: List[Tuple[type, RuntimeError]] = []
+    for cls in reversed(classes):  # in reverse order of registration
         try:
             bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            errors.append(
-                traceback.format_exc() + f"\nbpy.utils.unregister_class({cls}):"
-            )
+        except RuntimeError as e:
+            errors.append((cls, e))
     if errors:
-        raise RuntimeError("\n".join(errors))
+        raise RuntimeError(
+            "\n".join(
+                "".join(traceback.format_exception(type(e), e, e.__traceback__))
+                + f"\nbpy.utils.unregister_class({cls}):"
+                for cls, e in errors
+            )
+        )
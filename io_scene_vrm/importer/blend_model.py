@@ -13,8 +13,9 @@ import math
 import os.path
 import sys
 from math import radians, sqrt
-from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, cast
 
+import bmesh
 import bpy
 import numpy
 from mathutils import Matrix, Vector
@@ -74,8 +75,6 @@ class BlendModel:
             i = prog(i)
             self.make_armature()
             i = prog(i)
-            self.connect_bones()
-            i = prog(i)
             self.make_material()
             i = prog(i)
             self.make_primitive_mesh_objects(wm, i)
@@ -103,49 +102,40 @@ class BlendModel:
     def axis_glb_to_blender(vec3: Sequence[float]) -> List[float]:
         return [vec3[i] * t for i, t in zip([0, 2, 1], [-1, 1, 1])]
 
+    @staticmethod
+    def axis_glb_to_blender_ndarray(positions: numpy.ndarray) -> List[List[float]]:
+        # axis_glb_to_blender()を(N, 3)のndarrayにまとめて適用する
+        positions = numpy.reshape(positions, (-1, 3))
+        return cast(List[List[float]], (positions[:, [0, 2, 1]] * (-1, 1, 1)).tolist())
+
     def connect_bones(self) -> None:
+        # make_armature()のEDITモード中に呼ばれる。ここでモードは切り替えない
         armature = self.armature
         if armature is None:
             raise Exception("armature is None")
 
         # Blender_VRMAutoIKSetup (MIT License)
         # https://booth.pm/ja/items/1697977
-        previous_active = bpy.context.view_layer.objects.active
-        try:
-            bpy.context.view_layer.objects.active = self.armature  # アーマチャーをアクティブに
-            bpy.ops.object.mode_set(mode="EDIT")  # エディットモードに入る
-            disconnected_bone_names = []  # 結合されてないボーンのリスト
-            if str(
-                json_get(
-                    self.vrm_pydata.json, ["extensions", "VRM", "exporterVersion"], ""
-                )
-            ).startswith("VRoidStudio-"):
-                disconnected_bone_names = [
-                    "J_Bip_R_Hand",
-                    "J_Bip_L_Hand",
-                    "J_Bip_L_LowerLeg",
-                    "J_Bip_R_LowerLeg",
-                ]
-            bpy.ops.armature.select_all(action="SELECT")  # 全てのボーンを選択
-            for bone in bpy.context.selected_bones:  # 選択しているボーンに対して繰り返し処理
-                for (
-                    disconnected_bone_name
-                ) in disconnected_bone_names:  # 結合されてないボーンのリスト分繰り返し処理
-                    # リストに該当するオブジェクトがシーン中にあったら処理
-                    if bone.name == disconnected_bone_name:
-                        # disconnected_bone変数に処理ボーンを代入
-                        disconnected_bone = armature.data.edit_bones[
-                            disconnected_bone_name
-                        ]
-                        # 処理対象の親ボーンのTailと処理対象のHeadを一致させる
-                        disconnected_bone.parent.tail = disconnected_bone.head
+        disconnected_bone_names = []  # 結合されてないボーンのリスト
+        if str(
+            json_get(self.vrm_pydata.json, ["extensions", "VRM", "exporterVersion"], "")
+        ).startswith("VRoidStudio-"):
+            disconnected_bone_names = [
+                "J_Bip_R_Hand",
+                "J_Bip_L_Hand",
+                "J_Bip_L_LowerLeg",
+                "J_Bip_R_LowerLeg",
+            ]
+        edit_bones = armature.data.edit_bones
+        for disconnected_bone_name in disconnected_bone_names:
+            # リストに該当するボーンがアーマチュア中にあったら処理
+            disconnected_bone = edit_bones.get(disconnected_bone_name)
+            if disconnected_bone is None or disconnected_bone.parent is None:
+                continue
+            # 処理対象の親ボーンのTailと処理対象のHeadを一致させる
+            disconnected_bone.parent.tail = disconnected_bone.head
 
-            make_armature.connect_parent_tail_and_child_head_if_same_position(
-                armature.data
-            )
-            bpy.ops.object.mode_set(mode="OBJECT")
-        finally:
-            bpy.context.view_layer.objects.active = previous_active
+        make_armature.connect_parent_tail_and_child_head_if_same_position(armature.data)
 
     def scene_init(self) -> bpy.types.Object:
         # active_objectがhideだとbpy.ops.object.mode_set.poll()に失敗してエラーが出るのでその回避と、それを元に戻す
@@ -206,13 +196,14 @@ class BlendModel:
         bpy.ops.object.mode_set(mode="EDIT")
         self.bones = {}
         armature_edit_bones: Dict[int, bpy.types.Bone] = {}
+        nodes_dict = self.vrm_pydata.nodes_dict
 
         # region bone recursive func
         def bone_chain(node_id: int, parent_node_id: int) -> None:
             if node_id == -1:  # 自身がrootのrootの時
                 return
 
-            py_bone = self.vrm_pydata.nodes_dict[node_id]
+            py_bone = nodes_dict[node_id]
             if py_bone.blend_bone:  # すでに割り当て済みのボーンが出てきたとき、その親の位置に動かす
                 if parent_node_id == -1 or py_bone.blend_bone.parent is not None:
                     return
@@ -233,9 +224,8 @@ class BlendModel:
                 parent_pos = [0, 0, 0]
             else:
                 parent_pos = self.bones[parent_node_id].head
-            b.head = numpy.array(parent_pos) + numpy.array(
-                self.axis_glb_to_blender(py_bone.position)
-            )
+            position = self.axis_glb_to_blender(py_bone.position)
+            b.head = numpy.array(parent_pos) + numpy.array(position)
 
             # region temporary tail pos(glTF doesn't have bone. there defines as joints )
             def vector_length(bone_vector: List[float]) -> float:
@@ -251,14 +241,8 @@ class BlendModel:
                     b.tail = [b.head[0], b.head[1] + 0.05, b.head[2]]
                 else:  # normalize length to 0.03 末代:親から距離をちょっととる感じ
                     # 0除算除けと気分
-                    length = max(
-                        0.01,
-                        vector_length(self.axis_glb_to_blender(py_bone.position)) * 30,
-                    )
-                    pos_diff = [
-                        self.axis_glb_to_blender(py_bone.position)[i] / length
-                        for i in range(3)
-                    ]
+                    length = max(0.01, vector_length(position) * 30)
+                    pos_diff = [position[i] / length for i in range(3)]
                     if vector_length(pos_diff) <= 0.001:
                         # ボーンの長さが1mm以下なら上に10cm延ばす 長さが0だとOBJECT MODEに戻った時にボーンが消えるので上向けとく
                         pos_diff[1] += 0.01
@@ -267,7 +251,7 @@ class BlendModel:
                 mean_relate_pos = numpy.array([0.0, 0.0, 0.0], dtype=numpy.float)
                 for child_id in py_bone.children:
                     mean_relate_pos += self.axis_glb_to_blender(
-                        self.vrm_pydata.nodes_dict[child_id].position
+                        nodes_dict[child_id].position
                     )
                 children_len = len(py_bone.children)
                 if children_len > 0:
@@ -304,18 +288,22 @@ class BlendModel:
         def find_connected_node_ids(parent_node_ids: Sequence[int]) -> Set[int]:
             node_ids = set(parent_node_ids)
             for parent_node_id in parent_node_ids:
-                py_bone = self.vrm_pydata.nodes_dict[parent_node_id]
+                py_bone = nodes_dict[parent_node_id]
                 if py_bone.children is not None:
                     node_ids |= find_connected_node_ids(py_bone.children)
             return node_ids
 
+        edit_bones = self.armature.data.edit_bones
         for node_id in sorted(find_connected_node_ids(root_nodes)):
-            bone_name = self.vrm_pydata.nodes_dict[node_id].name
-            armature_edit_bones[node_id] = self.armature.data.edit_bones.new(bone_name)
+            armature_edit_bones[node_id] = edit_bones.new(nodes_dict[node_id].name)
 
         bone_nodes = [(root_node, -1) for root_node in root_nodes]
         while bone_nodes:
             bone_chain(*bone_nodes.pop())
+
+        # EDITモードを抜ける前にボーンの接続も済ませておく
+        self.connect_bones()
+
         # call when bone built
         self.context.scene.view_layers.update()
         bpy.ops.object.mode_set(mode="OBJECT")
@@ -787,7 +775,7 @@ class BlendModel:
             face_index = [tri for prim in pymesh for tri in prim.face_indices]
             if pymesh[0].POSITION is None:
                 continue
-            pos = list(map(self.axis_glb_to_blender, pymesh[0].POSITION))
+            pos = self.axis_glb_to_blender_ndarray(pymesh[0].POSITION)
             b_mesh.from_pydata(pos, [], face_index)
             b_mesh.update()
             obj = bpy.data.objects.new(pymesh[0].name, b_mesh)
@@ -839,6 +827,9 @@ class BlendModel:
                 # VertexGroupに頂点属性から一個ずつウェイトを入れる用の辞書作り
                 for prim in pymesh:
                     if prim.JOINTS_0 is not None and prim.WEIGHTS_0 is not None:
+                        # 1頂点ずつPythonで処理するのでlistにしておく
+                        joints_0 = prim.JOINTS_0.tolist()
+                        weights_0 = prim.WEIGHTS_0.tolist()
                         # 使うkey(bone名)のvalueを空のリストで初期化(中身まで全部内包表記で?キモすぎるからしない。
                         vg_dict: Dict[str, List[Tuple[int, float]]] = {
                             self.vrm_pydata.nodes_dict[
@@ -846,12 +837,12 @@ class BlendModel:
                             ].name: list()
                             for joint_id in [
                                 joint_id
-                                for joint_ids in prim.JOINTS_0
+                                for joint_ids in joints_0
                                 for joint_id in joint_ids
                             ]
                         }
                         for v_index, (joint_ids, weights) in enumerate(
-                            zip(prim.JOINTS_0, prim.WEIGHTS_0)
+                            zip(joints_0, weights_0)
                         ):
                             # region VroidがJoints:[18,18,0,0]とかで格納してるからその処理を
                             normalized_joint_ids = list(dict.fromkeys(joint_ids))
@@ -936,7 +927,7 @@ class BlendModel:
                         if channel_name not in b_mesh.uv_layers:
                             b_mesh.uv_layers.new(name=channel_name)
                         blender_uv_data = b_mesh.uv_layers[channel_name].data
-                        vrm_texcoord = getattr(prim, channel_name)
+                        vrm_texcoord = getattr(prim, channel_name).tolist()
                         for node_id, v_index in enumerate(flatten_vrm_mesh_vert_index):
                             blender_uv_data[node_id].uv = vrm_texcoord[v_index]
                             # to blender axis (上下反転)
@@ -951,11 +942,7 @@ class BlendModel:
 
             # region Normal #TODO
             if self.import_normal:
-                bpy.ops.object.mode_set(mode="OBJECT")
-                bpy.ops.object.select_all(action="DESELECT")
-                self.context.view_layer.objects.active = obj
-                obj.select_set(True)
-                bpy.ops.object.shade_smooth()  # this is need
+                self.shade_smooth(b_mesh)  # this is need
                 b_mesh.create_normals_split()
                 # bpy.ops.mesh.customdata_custom_splitnormals_add()
                 for prim in pymesh:
@@ -966,12 +953,15 @@ class BlendModel:
                         prim.vert_normal_normalized is None
                         or not prim.vert_normal_normalized
                     ):
-                        normalized_normal = [
-                            Vector(n)
-                            if abs(Vector(n).magnitude - 1.0) < sys.float_info.epsilon
-                            else Vector(n).normalized()
-                            for n in prim.NORMAL
-                        ]
+                        normalized_normal = numpy.array(
+                            [
+                                Vector(n)
+                                if abs(Vector(n).magnitude - 1.0)
+                                < sys.float_info.epsilon
+                                else Vector(n).normalized()
+                                for n in prim.NORMAL
+                            ]
+                        )
                         prim.vert_normal_normalized = True
                         prim.NORMAL = normalized_normal
                     b_mesh.normals_split_custom_set_from_vertices(
@@ -1015,8 +1005,9 @@ class BlendModel:
                             vc = b_mesh.vertex_colors[vc_color_name]
                         else:
                             vc = b_mesh.vertex_colors.new(name=vc_color_name)
+                        vrm_color = getattr(prim, vc_color_name).tolist()
                         for v_index, _ in enumerate(vc.data):
-                            vc.data[v_index].color = getattr(prim, vc_color_name)[
+                            vc.data[v_index].color = vrm_color[
                                 flatten_vrm_mesh_vert_index[v_index]
                             ]
                         vcolor_count += 1
@@ -1028,11 +1019,10 @@ class BlendModel:
             # region shape_key
             # shapekey_data_factory with cache
             def absolutize_morph_positions(
-                base_points: List[List[float]],
+                base_points: numpy.ndarray,
                 morph_target_pos_and_index: List[Any],
                 prim: vrm_types.Mesh,
             ) -> List[List[float]]:
-                shape_key_positions = []
                 morph_target_pos = morph_target_pos_and_index[0]
                 morph_target_index = morph_target_pos_and_index[1]
 
@@ -1048,13 +1038,15 @@ class BlendModel:
                         (prim.POSITION_accessor, morph_target_index)
                     ]
 
-                for base_pos, morph_pos in zip(base_points, morph_target_pos):
-                    # numpy.array毎回作るのは見た目きれいだけど8倍くらい遅い
-                    shape_key_positions.append(
-                        self.axis_glb_to_blender(
-                            [base_pos[i] + morph_pos[i] for i in range(3)]
-                        )
+                # 両方ndarrayなのでまとめて足す。floatの足し算と同じ結果になるようfloat64で計算
+                count = min(len(base_points), len(morph_target_pos))
+                shape_key_positions = self.axis_glb_to_blender_ndarray(
+                    numpy.add(
+                        base_points[:count],
+                        morph_target_pos[:count],
+                        dtype=numpy.float64,
                     )
+                )
                 morph_cache_dict[
                     (prim.POSITION_accessor, morph_target_index)
                 ] = shape_key_positions
@@ -1093,12 +1085,12 @@ class BlendModel:
 
             # region vertices_merging
             if self.remove_doubles:
-                bpy.ops.object.mode_set(mode="OBJECT")
-                bpy.ops.object.select_all(action="DESELECT")
-                self.context.view_layer.objects.active = obj
-                obj.select_set(True)
-                bpy.ops.object.mode_set(mode="EDIT")
-                bpy.ops.mesh.remove_doubles(use_unselected=True)
+                bm = bmesh.new()
+                bm.from_mesh(b_mesh)
+                # bpy.ops.mesh.remove_doubles()と同じ閾値
+                bmesh.ops.remove_doubles(bm, verts=bm.verts[:], dist=0.0001)
+                bm.to_mesh(b_mesh)
+                bm.free()
             # endregion vertices_merging
 
             # progress update
@@ -1245,15 +1237,16 @@ class BlendModel:
         write_textblock_and_assign_to_armature("spring_bone", spring_bonegroup_list)
         # endregion springbone
 
+    @staticmethod
+    def shade_smooth(mesh: bpy.types.Mesh) -> None:
+        # bpy.ops.object.shade_smooth()はアクティブ化と選択が必要なうえに遅いので直接書き込む
+        mesh.polygons.foreach_set("use_smooth", [True] * len(mesh.polygons))
+        mesh.update()
+
     def cleaning_data(self) -> None:
         # collection setting
-        bpy.ops.object.mode_set(mode="OBJECT")
-        bpy.ops.object.select_all(action="DESELECT")
         for obj in self.meshes.values():
-            self.context.view_layer.objects.active = obj
-            obj.select_set(True)
-            bpy.ops.object.shade_smooth()
-            bpy.ops.object.select_all(action="DESELECT")
+            self.shade_smooth(obj.data)
 
     def set_bone_roll(self) -> None:
         armature = self.armature
@@ -1324,10 +1317,10 @@ class BlendModel:
                         continue
                     bone[key] = val
 
+        # コライダーのmatrix_worldは親ボーンの評価済みの行列から計算されるので、先に更新する
+        self.context.view_layer.update()
         coll = bpy.data.collections.new("Colliders")
         self.context.scene.collection.children.link(coll)
-        bpy.context.view_layer.depsgraph.update()
-        bpy.context.scene.view_layers.update()
         for collider_group in collider_groups_json:
             collider_base_node = nodes_json[collider_group["node"]]
             node_name = collider_base_node["name"]
@@ -1461,15 +1454,11 @@ class ICYP_OT_select_helper(bpy.types.Operator):  # type: ignore[misc] # noqa: N
 def shader_node_group_import(shader_node_group_name: str) -> None:
     if shader_node_group_name in bpy.data.node_groups:
         return
-    filedir = os.path.join(
+    filepath = os.path.join(
         os.path.dirname(os.path.dirname(__file__)),
         "resources",
         "material_node_groups.blend",
-        "NodeTree",
-    )
-    filepath = os.path.join(filedir, shader_node_group_name)
-    bpy.ops.wm.append(
-        filepath=filepath,
-        filename=shader_node_group_name,
-        directory=filedir,
     )
+    with bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
+        if shader_node_group_name in data_from.node_groups:
+            data_to.node_groups = [shader_node_group_name]
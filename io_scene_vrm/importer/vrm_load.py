@@ -8,12 +8,13 @@ https://opensource.org/licenses/mit-license.php
 import contextlib
 import json
 import math
+import mmap
 import os
 import re
+import struct
 import sys
 import tempfile
-from collections import OrderedDict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from urllib.parse import ParseResult, parse_qsl, urlparse
 
 import numpy
@@ -25,8 +26,18 @@ from ..vrm_types import nested_json_value_getter as json_get
 from . import vrm2pydata_factory
 from .binary_reader import BinaryReader
 
+# orjsonがインストールされていれば、大きなJSONチャンクを速く読むために使う
+try:
+    import orjson
+except ImportError:
+    orjson_available = False
+else:
+    orjson_available = True
+
 
 class LicenseConfirmationRequiredProp:
+    __slots__ = ("url", "json_key", "message")
+
     def __init__(
         self,
         url: Optional[str],
@@ -49,6 +60,9 @@ message={self.message}
 class LicenseConfirmationRequired(Exception):
     def __init__(self, props: List[LicenseConfirmationRequiredProp]) -> None:
         self.props = props
+        # Set by read_parsed_vrm() so that the import can resume without parsing again
+        self.vrm_pydata: Optional[vrm_types.VrmPydata] = None
+        self.body_binary: Optional[bytes] = None
         super().__init__(self.description())
 
     def description(self) -> str:
@@ -66,58 +80,91 @@ class LicenseConfirmationRequired(Exception):
         ]
 
 
-def parse_glb(data: bytes) -> Tuple[Dict[str, Any], bytes]:
-    reader = BinaryReader(data)
-    magic = reader.read_str(4)
-    if magic != "glTF":
-        raise Exception("glTF header signature not found: #{}".format(magic))
+def parse_glb_header(data: Union[bytes, mmap.mmap]) -> int:
+    magic = data[:4]
+    if magic != b"glTF":
+        raise Exception(
+            "glTF header signature not found: #{}".format(
+                magic.decode("utf-8", errors="replace")
+            )
+        )
 
-    version = reader.read_as_data_type(GlConstants.UNSIGNED_INT)
+    version, size = struct.unpack_from("<II", data, 4)
     if version != 2:
         raise Exception(
             "version #{} found. This plugin only supports version 2".format(version)
         )
+    return int(size)
 
-    size = reader.read_as_data_type(GlConstants.UNSIGNED_INT)
-    size -= 12
 
-    json_str: Optional[str] = None
-    body: Optional[bytes] = None
-    while size > 0:
-        # print(size)
+def parse_glb_json_chunk(chunk_data: bytes) -> Dict[str, Any]:
+    if not chunk_data:
+        raise Exception("failed to read json chunk")
+
+    json_obj: Any = None
+    if orjson_available:
+        # NaNなどorjsonが読めないJSONは標準のjsonで読み直す
+        with contextlib.suppress(orjson.JSONDecodeError):
+            json_obj = orjson.loads(chunk_data)
+    if json_obj is None:
+        json_str = chunk_data.decode("utf-8")  # blenderのpythonverが古く自前decode要す
+        # Python 3.7以降のdictは順序を保持するのでOrderedDictは使わない。
+        # 同じキー文字列はjson.loads()の中で使い回されるので自前のキャッシュも要らない
+        json_obj = json.loads(json_str)
+    if not isinstance(json_obj, dict):
+        raise Exception("VRM has invalid json: " + str(json_obj))
+    return json_obj
+
+
+def parse_glb(data: Union[bytes, mmap.mmap]) -> Tuple[Dict[str, Any], bytes]:
+    size = parse_glb_header(data)
 
-        if json_str is not None and body is not None:
+    json_obj: Optional[Dict[str, Any]] = None
+    body: Optional[bytes] = None
+    offset = 12
+    while offset < size:
+        if json_obj is not None and body is not None:
             raise Exception(
                 "This VRM has multiple chunks, this plugin reads one chunk only."
             )
 
-        chunk_size = reader.read_unsigned_int()
-        size -= 4
-
-        chunk_type = reader.read_str(4)
-        size -= 4
-
-        chunk_data = reader.read_binary(chunk_size)
-        size -= chunk_size
+        chunk_size, chunk_type = struct.unpack_from("<I4s", data, offset)
+        offset += 8
+        # スライスしたところだけがbytesとしてコピーされる
+        chunk_data = data[offset : offset + chunk_size]
+        offset += chunk_size
 
-        if chunk_type == "BIN\x00":
+        if chunk_type == b"BIN\x00":
             body = chunk_data
             continue
-        if chunk_type == "JSON":
-            json_str = chunk_data.decode("utf-8")  # blenderのpythonverが古く自前decode要す
+        if chunk_type == b"JSON":
+            json_obj = parse_glb_json_chunk(chunk_data)
             continue
 
-        raise Exception("unknown chunk_type: {}".format(chunk_type))
+        raise Exception(
+            "unknown chunk_type: {}".format(
+                chunk_type.decode("utf-8", errors="replace")
+            )
+        )
 
-    if not json_str:
+    if json_obj is None:
         raise Exception("failed to read json chunk")
-
-    json_obj = json.loads(json_str, object_pairs_hook=OrderedDict)
-    if not isinstance(json_obj, dict):
-        raise Exception("VRM has invalid json: " + str(json_obj))
     return json_obj, body if body else bytes()
 
 
+# JSONだけが必要な場合用。BINチャンクはコピーせずに読み飛ばす
+def parse_glb_json_only(data: Union[bytes, mmap.mmap]) -> Dict[str, Any]:
+    size = parse_glb_header(data)
+    offset = 12
+    while offset < size:
+        chunk_size, chunk_type = struct.unpack_from("<I4s", data, offset)
+        offset += 8
+        if chunk_type == b"JSON":
+            return parse_glb_json_chunk(data[offset : offset + chunk_size])
+        offset += chunk_size
+    raise Exception("failed to read json chunk")
+
+
 # あくまでvrm(の特にバイナリ)をpythonデータ化するだけで、blender型に変形はここではしない
 def read_vrm(
     model_path: str,
@@ -127,10 +174,32 @@ def read_vrm(
     license_check: bool,
 ) -> vrm_types.VrmPydata:
     # datachunkは普通一つしかない
-    with open(model_path, "rb") as f:
-        json_dict, body_binary = parse_glb(f.read())
-        vrm_pydata = vrm_types.VrmPydata(model_path, json_dict)
+    # ファイル全体をbytesに読み込まず、mmapからチャンクの分だけコピーする
+    with open(model_path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        json_dict, body_binary = parse_glb(data)
+    vrm_pydata = vrm_types.VrmPydata(model_path, json_dict)
+
+    return read_parsed_vrm(
+        vrm_pydata,
+        body_binary,
+        extract_textures_into_folder,
+        make_new_texture_folder,
+        use_simple_principled_material,
+        license_check,
+    )
 
+
+# read_vrm()のparse_glb()以降の処理。ライセンス確認後はここから再開できる
+def read_parsed_vrm(
+    vrm_pydata: vrm_types.VrmPydata,
+    body_binary: bytes,
+    extract_textures_into_folder: bool,
+    make_new_texture_folder: bool,
+    use_simple_principled_material: bool,
+    license_check: bool,
+) -> vrm_types.VrmPydata:
     # KHR_DRACO_MESH_COMPRESSION は対応してない場合落とさないといけないらしい。どのみち壊れたデータになるからね。
     if (
         "extensionsRequired" in vrm_pydata.json
@@ -141,7 +210,12 @@ def read_vrm(
         )
 
     if license_check:
-        validate_license(vrm_pydata)
+        try:
+            validate_license(vrm_pydata)
+        except LicenseConfirmationRequired as e:
+            e.vrm_pydata = vrm_pydata
+            e.body_binary = body_binary
+            raise
 
     texture_rip(
         vrm_pydata, body_binary, extract_textures_into_folder, make_new_texture_folder
@@ -157,6 +231,10 @@ def read_vrm(
     return vrm_pydata
 
 
+# validate_*_license_url()が扱うライセンスURLのホスト名
+known_license_url_hostnames = frozenset(["hub.vroid.com", "uv-license.com"])
+
+
 def validate_license_url(
     url_str: str, json_key: str, props: List[LicenseConfirmationRequiredProp]
 ) -> None:
@@ -165,7 +243,8 @@ def validate_license_url(
     url = None
     with contextlib.suppress(ValueError):
         url = urlparse(url_str)
-    if url:
+    # 既知のライセンスURL以外はクエリをパースするまでもなく確認が必要
+    if url and url.hostname in known_license_url_hostnames:
         query_dict = dict(parse_qsl(url.query))
         if validate_vroid_hub_license_url(
             url, query_dict, json_key, props
@@ -223,15 +302,19 @@ def validate_uni_virtual_license_url(
     return True
 
 
+no_derivatives_license_name_pattern = re.compile("CC.*ND")
+
+
 def validate_license(vrm_pydata: vrm_types.VrmPydata) -> None:
     confirmations: List[LicenseConfirmationRequiredProp] = []
+    meta = json_get(vrm_pydata.json, ["extensions", "VRM", "meta"])
+    if not isinstance(meta, dict):
+        meta = {}
 
     # 既知の改変不可ライセンスを撥ねる
     # CC_NDなど
-    license_name = str(
-        json_get(vrm_pydata.json, ["extensions", "VRM", "meta", "licenseName"], "")
-    )
-    if re.match("CC(.*)ND(.*)", license_name):
+    license_name = str(json_get(meta, ["licenseName"], ""))
+    if no_derivatives_license_name_pattern.match(license_name):
         confirmations.append(
             LicenseConfirmationRequiredProp(
                 None,
@@ -242,21 +325,13 @@ def validate_license(vrm_pydata: vrm_types.VrmPydata) -> None:
         )
 
     validate_license_url(
-        str(
-            json_get(
-                vrm_pydata.json, ["extensions", "VRM", "meta", "otherPermissionUrl"], ""
-            )
-        ),
+        str(json_get(meta, ["otherPermissionUrl"], "")),
         "otherPermissionUrl",
         confirmations,
     )
 
     if license_name == "Other":
-        other_license_url_str = str(
-            json_get(
-                vrm_pydata.json, ["extensions", "VRM", "meta", "otherLicenseUrl"], ""
-            )
-        )
+        other_license_url_str = str(json_get(meta, ["otherLicenseUrl"], ""))
         if not other_license_url_str:
             confirmations.append(
                 LicenseConfirmationRequiredProp(
@@ -275,6 +350,13 @@ def validate_license(vrm_pydata: vrm_types.VrmPydata) -> None:
         raise LicenseConfirmationRequired(confirmations)
 
 
+# ファイル名から取り除く文字の変換表。0から31の制御文字と "*/:<>?\|
+# 32:space #33:! は残す
+invalid_filename_chars_remove_table = str.maketrans(
+    "", "", "".join(map(chr, range(32))) + '"*/:<>?\\|'
+)
+
+
 def texture_rip(
     vrm_pydata: vrm_types.VrmPydata,
     body_binary: bytes,
@@ -299,64 +381,16 @@ def texture_rip(
         dir_path = tempfile.mkdtemp()  # TODO: cleanup
 
     def invalid_chars_remover(filename: str) -> str:
-        unsafe_chars = {
-            0: "\x00",
-            1: "\x01",
-            2: "\x02",
-            3: "\x03",
-            4: "\x04",
-            5: "\x05",
-            6: "\x06",
-            7: "\x07",
-            8: "\x08",
-            9: "\t",
-            10: "\n",
-            11: "\x0b",
-            12: "\x0c",
-            13: "\r",
-            14: "\x0e",
-            15: "\x0f",
-            16: "\x10",
-            17: "\x11",
-            18: "\x12",
-            19: "\x13",
-            20: "\x14",
-            21: "\x15",
-            22: "\x16",
-            23: "\x17",
-            24: "\x18",
-            25: "\x19",
-            26: "\x1a",
-            27: "\x1b",
-            28: "\x1c",
-            29: "\x1d",
-            30: "\x1e",
-            31: "\x1f",
-            34: '"',
-            42: "*",
-            47: "/",
-            58: ":",
-            60: "<",
-            62: ">",
-            63: "?",
-            92: "\\",
-            124: "|",
-        }  # 32:space #33:!
-        remove_table = str.maketrans(
-            "", "", "".join([chr(charnum) for charnum in unsafe_chars])
-        )
-        safe_filename = filename.translate(remove_table)
-        return safe_filename
+        return filename.translate(invalid_filename_chars_remove_table)
 
     for image_id, image_prop in enumerate(vrm_pydata.json["images"]):
         if "extra" in image_prop:
             image_name = image_prop["extra"]["name"]
         else:
             image_name = image_prop["name"]
-        binary_reader.set_pos(buffer_views[image_prop["bufferView"]]["byteOffset"])
-        image_binary = binary_reader.read_binary(
-            buffer_views[image_prop["bufferView"]]["byteLength"]
-        )
+        buffer_view = buffer_views[image_prop["bufferView"]]
+        binary_reader.set_pos(buffer_view["byteOffset"])
+        image_binary = binary_reader.read_binary(buffer_view["byteLength"])
         image_type = image_prop["mimeType"].split("/")[-1]
         if image_name == "":
             image_name = "texture_" + str(image_id)
@@ -403,37 +437,66 @@ def texture_rip(
 
 
 #  "accessorの順に" データを読み込んでリストにしたものを返す
-def decode_bin(json_data: Dict[str, Any], binary: bytes) -> List[Any]:
-    br = BinaryReader(binary)
+# glTFのcomponentTypeに対応するリトルエンディアンのnumpyのdtype
+component_type_to_dtype: Dict[int, Any] = {
+    GlConstants.BYTE: numpy.dtype("<i1"),
+    GlConstants.UNSIGNED_BYTE: numpy.dtype("<u1"),
+    GlConstants.SHORT: numpy.dtype("<i2"),
+    GlConstants.UNSIGNED_SHORT: numpy.dtype("<u2"),
+    GlConstants.INT: numpy.dtype("<i4"),
+    GlConstants.UNSIGNED_INT: numpy.dtype("<u4"),
+    GlConstants.FLOAT: numpy.dtype("<f4"),
+}
+
+
+def decode_bin(json_data: Dict[str, Any], binary: bytes) -> List[numpy.ndarray]:
     # This list indexed by accessor index
-    decoded_binary: List[Any] = []
+    decoded_binary: List[numpy.ndarray] = []
     buffer_views = json_data["bufferViews"]
     accessors = json_data["accessors"]
     type_num_dict = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
     for accessor_index, accessor in enumerate(accessors):
         type_num = type_num_dict[accessor["type"]]
+        component_type = accessor["componentType"]
+        dtype = component_type_to_dtype.get(component_type)
+        if dtype is None:
+            print("unsupported type : {}".format(component_type))
+            raise Exception
         if "bufferView" not in accessor:
-            print(
-                f"WARNING: accessors[{accessor_index}] doesn't have bufferView that is not implemented yet"
-            )
-            decoded_binary.append([])
+            # glTFの仕様ではbufferViewの無いaccessorは全要素0として扱う
+            if "sparse" in accessor:
+                print(
+                    f"WARNING: accessors[{accessor_index}] has sparse that is not implemented yet"
+                )
+            shape = (accessor["count"], type_num) if type_num > 1 else accessor["count"]
+            decoded_binary.append(numpy.zeros(shape, dtype=dtype))
             continue
-        br.set_pos(buffer_views[accessor["bufferView"]]["byteOffset"])
-        data_list = []
-        for _ in range(accessor["count"]):
-            if type_num == 1:
-                data = br.read_as_data_type(accessor["componentType"])
-            else:
-                data = []  # type: ignore[assignment]
-                for _ in range(type_num):
-                    data.append(br.read_as_data_type(accessor["componentType"]))  # type: ignore[union-attr]
-            data_list.append(data)
-        decoded_binary.append(data_list)
+        # 1要素ずつPythonで読むと遅いのでnumpyでまとめて読む
+        data = numpy.frombuffer(
+            binary,
+            dtype=dtype,
+            count=accessor["count"] * type_num,
+            offset=buffer_views[accessor["bufferView"]].get("byteOffset", 0),
+        )
+        if type_num > 1:
+            data = data.reshape(-1, type_num)
+        decoded_binary.append(data)
 
     return decoded_binary
 
 
 def mesh_read(vrm_pydata: vrm_types.VrmPydata) -> None:
+    # 古いUniVRM誤りの判定はファイル単位なので最初に一度だけ行う
+    legacy_uv_flag = False  # f***
+    gen = str(json_get(vrm_pydata.json, ["assets", "generator"], ""))
+    if gen.startswith("UniGLTF"):
+        with contextlib.suppress(ValueError):
+            if float(gen[-4:]) < 1.16:
+                legacy_uv_flag = True
+
+    decoded_binary = vrm_pydata.decoded_binary
+    fixed_texcoord_accessor_indices: Set[int] = set()
+
     # メッシュをパースする
     for n, mesh in enumerate(vrm_pydata.json.get("meshes", [])):
         primitives = []
@@ -450,42 +513,34 @@ def mesh_read(vrm_pydata: vrm_types.VrmPydata) -> None:
                 raise Exception(
                     "Unsupported polygon type(:{}) Exception".format(primitive["mode"])
                 )
-            face_indices = vrm_pydata.decoded_binary[primitive["indices"]]
+            face_indices = decoded_binary[primitive["indices"]]
             # 3要素ずつに変換しておく(GlConstants.TRIANGLES前提なので)
-            # ATTENTION これだけndarray
+            # ATTENTION 頂点属性やモーフターゲットもdecode_bin()のndarrayのまま持つ
             vrm_mesh.face_indices = numpy.reshape(face_indices, (-1, 3))
             # endregion 頂点index
 
             # ここから頂点属性
             vertex_attributes = primitive.get("attributes", {})
             # 頂点属性は実装によっては存在しない属性(例えばJOINTSやWEIGHTSがなかったりもする)もあるし、UVや頂点カラー0->Nで増やせる(スキニングは1要素(ボーン4本)限定
-            for attr in vertex_attributes.keys():
-                vrm_mesh.__setattr__(
-                    attr, vrm_pydata.decoded_binary[vertex_attributes[attr]]
-                )
-
             # region TEXCOORD_FIX [ 古いUniVRM誤り: uv.y = -uv.y ->修復 uv.y = 1 - ( -uv.y ) => uv.y=1+uv.y]
-            legacy_uv_flag = False  # f***
-            gen = str(json_get(vrm_pydata.json, ["assets", "generator"], ""))
-            if re.match("UniGLTF", gen):
-                with contextlib.suppress(ValueError):
-                    if float("".join(gen[-4:])) < 1.16:
-                        legacy_uv_flag = True
-
-            uv_count = 0
-            while True:
-                texcoord_name = "TEXCOORD_{}".format(uv_count)
-                if hasattr(vrm_mesh, texcoord_name):
-                    texcoord = getattr(vrm_mesh, texcoord_name)
-                    if legacy_uv_flag:
-                        for uv in texcoord:
-                            uv[1] = 1 + uv[1]
-                    uv_count += 1
-                else:
-                    break
+            if legacy_uv_flag:
+                for texcoord_name, accessor_index in vertex_attributes.items():
+                    if (
+                        not texcoord_name.startswith("TEXCOORD_")
+                        or accessor_index in fixed_texcoord_accessor_indices
+                    ):
+                        continue
+                    # 他のprimitiveと共有されるaccessorなので、decoded_binaryを一度だけ置き換える。
+                    # decode_bin()の結果は読み取り専用なので新しいndarrayにする
+                    texcoord = decoded_binary[accessor_index]
+                    decoded_binary[accessor_index] = texcoord + (0.0, 1.0)
+                    fixed_texcoord_accessor_indices.add(accessor_index)
             # blenderとは上下反対のuv,それはblenderに書き込むときに直す
             # endregion TEXCOORD_FIX
 
+            for attr in vertex_attributes.keys():
+                vrm_mesh.__setattr__(attr, decoded_binary[vertex_attributes[attr]])
+
             # meshに当てられるマテリアルの場所を記録
             vrm_mesh.material_index = primitive["material"]
 
@@ -494,18 +549,20 @@ def mesh_read(vrm_pydata: vrm_types.VrmPydata) -> None:
 
             # ここからモーフターゲット vrmのtargetは相対位置 normalは無視する
             if "targets" in primitive:
-                morph_target_point_list_and_accessor_index_dict = OrderedDict()
+                morph_target_point_list_and_accessor_index_dict: Dict[
+                    str, List[Any]
+                ] = {}
                 for i, morph_target in enumerate(primitive["targets"]):
-                    pos_array = vrm_pydata.decoded_binary[morph_target["POSITION"]]
+                    pos_accessor_index = morph_target["POSITION"]
                     if "extra" in morph_target:  # for old AliciaSolid
                         # accessorのindexを持つのは変換時のキャッシュ対応のため
-                        morph_name = str(primitive["targets"][i]["extra"]["name"])
+                        morph_name = str(morph_target["extra"]["name"])
                     else:
                         morph_name = str(primitive["extras"]["targetNames"][i])
                         # 同上
                     morph_target_point_list_and_accessor_index_dict[morph_name] = [
-                        pos_array,
-                        primitive["targets"][i]["POSITION"],
+                        decoded_binary[pos_accessor_index],
+                        pos_accessor_index,
                     ]
                 vrm_mesh.morph_target_point_list_and_accessor_index_dict = (
                     morph_target_point_list_and_accessor_index_dict
@@ -565,45 +622,14 @@ def node_read(vrm_pydata: vrm_types.VrmPydata) -> None:
 
 def create_vrm_dict(data: bytes) -> Dict[str, Any]:
     vrm_json, binary_chunk = parse_glb(data)
+    # vrm_dict_diff()ではndarrayのまま比較する
     vrm_json["~accessors_decoded"] = decode_bin(vrm_json, binary_chunk)
     return vrm_json
 
 
-def vrm_dict_diff(
+def vrm_value_diff(
     left: Any, right: Any, path: str, float_tolerance: float
 ) -> List[str]:
-    if isinstance(left, list):
-        if not isinstance(right, list):
-            return [f"{path}: left is list but right is {type(right)}"]
-        if len(left) != len(right):
-            return [
-                f"{path}: left length is {len(left)} but right length is {len(right)}"
-            ]
-        diffs = []
-        for i, _ in enumerate(left):
-            diffs.extend(
-                vrm_dict_diff(left[i], right[i], f"{path}[{i}]", float_tolerance)
-            )
-        return diffs
-
-    if isinstance(left, dict):
-        if not isinstance(right, dict):
-            return [f"{path}: left is dict but right is {type(right)}"]
-        diffs = []
-        for key in sorted(set(list(left.keys()) + list(right.keys()))):
-            if key not in left:
-                diffs.append(f"{path}: {key} not in left")
-                continue
-            if key not in right:
-                diffs.append(f"{path}: {key} not in right")
-                continue
-            diffs.extend(
-                vrm_dict_diff(
-                    left[key], right[key], f'{path}["{key}"]', float_tolerance
-                )
-            )
-        return diffs
-
     if isinstance(left, bool):
         if not isinstance(right, bool):
             return [f"{path}: left is bool but right is {type(right)}"]
@@ -637,6 +663,146 @@ def vrm_dict_diff(
     raise Exception(f"{path}: unexpected type left={type(left)} right={type(right)}")
 
 
+def numeric_list_to_array(values: List[Any]) -> Optional[numpy.ndarray]:
+    # 数値のlistか、同じ長さの数値のlistのlist(デコード済みのaccessor)だけを対象にする。
+    # 値を正確に保てるfloatだけ、またはint64に収まるintだけの場合に限る。
+    # intとfloatが混ざるとfloat64に丸められ、intの差分を見逃すため
+    if not values:
+        return None
+    rows = values
+    if type(values[0]) is list:
+        width = len(values[0])
+        if not width or not all(
+            type(row) is list and len(row) == width for row in values
+        ):
+            return None
+    else:
+        rows = [values]
+    value_type = type(rows[0][0])
+    if value_type not in (int, float) or not all(
+        type(value) is value_type for row in rows for value in row
+    ):
+        return None
+    try:
+        array: numpy.ndarray = numpy.array(
+            values, dtype=numpy.int64 if value_type is int else numpy.float64
+        )
+    except OverflowError:
+        return None
+    return array
+
+
+def vrm_ndarray_diff(
+    left_array: numpy.ndarray,
+    right_array: numpy.ndarray,
+    left: Any,
+    right: Any,
+    path: str,
+    float_tolerance: float,
+) -> List[str]:
+    # 値が異なる要素だけを元のデータから取り出して1つずつ比較し、差分のメッセージを作る
+    diffs = []
+    for indices in numpy.argwhere(left_array != right_array):
+        left_value = left
+        right_value = right
+        for index in indices:
+            left_value = left_value[index]
+            right_value = right_value[index]
+        if isinstance(left_value, numpy.generic):
+            left_value = left_value.item()
+        if isinstance(right_value, numpy.generic):
+            right_value = right_value.item()
+        diffs.extend(
+            vrm_value_diff(
+                left_value,
+                right_value,
+                path + "".join(f"[{index}]" for index in indices),
+                float_tolerance,
+            )
+        )
+    return diffs
+
+
+def vrm_numeric_list_diff(
+    left: List[Any], right: List[Any], path: str, float_tolerance: float
+) -> Optional[List[str]]:
+    left_array = numeric_list_to_array(left)
+    if left_array is None:
+        return None
+    right_array = numeric_list_to_array(right)
+    if right_array is None or left_array.shape != right_array.shape:
+        return None
+    return vrm_ndarray_diff(left_array, right_array, left, right, path, float_tolerance)
+
+
+def vrm_dict_diff(
+    left: Any, right: Any, path: str, float_tolerance: float
+) -> List[str]:
+    diffs: List[str] = []
+    # 大きなVRMでも再帰の深さや呼び出しの負荷が問題にならないようスタックで辿る。
+    # 差分のメッセージはそのまま、比較するものは(left, right, path)で積む
+    stack: List[Union[str, Tuple[Any, Any, str]]] = [(left, right, path)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            diffs.append(item)
+            continue
+        left, right, path = item
+
+        if isinstance(left, numpy.ndarray) or isinstance(right, numpy.ndarray):
+            if (
+                isinstance(left, numpy.ndarray)
+                and isinstance(right, numpy.ndarray)
+                and left.shape == right.shape
+            ):
+                diffs.extend(
+                    vrm_ndarray_diff(left, right, left, right, path, float_tolerance)
+                )
+                continue
+            # 形が異なる場合はlistとして比較してlistと同じメッセージにする
+            if isinstance(left, numpy.ndarray):
+                left = left.tolist()
+            if isinstance(right, numpy.ndarray):
+                right = right.tolist()
+
+        if isinstance(left, list):
+            if not isinstance(right, list):
+                diffs.append(f"{path}: left is list but right is {type(right)}")
+                continue
+            if len(left) != len(right):
+                diffs.append(
+                    f"{path}: left length is {len(left)} but right length is {len(right)}"
+                )
+                continue
+            numeric_diffs = vrm_numeric_list_diff(left, right, path, float_tolerance)
+            if numeric_diffs is not None:
+                diffs.extend(numeric_diffs)
+                continue
+            stack.extend(
+                (left[i], right[i], f"{path}[{i}]") for i in reversed(range(len(left)))
+            )
+            continue
+
+        if isinstance(left, dict):
+            if not isinstance(right, dict):
+                diffs.append(f"{path}: left is dict but right is {type(right)}")
+                continue
+            items: List[Union[str, Tuple[Any, Any, str]]] = []
+            for key in sorted(set(left.keys()) | set(right.keys())):
+                if key not in left:
+                    items.append(f"{path}: {key} not in left")
+                    continue
+                if key not in right:
+                    items.append(f"{path}: {key} not in right")
+                    continue
+                items.append((left[key], right[key], f'{path}["{key}"]'))
+            stack.extend(reversed(items))
+            continue
+
+        diffs.extend(vrm_value_diff(left, right, path, float_tolerance))
+    return diffs
+
+
 def vrm_diff(before: bytes, after: bytes, float_tolerance: float) -> List[str]:
     return vrm_dict_diff(
         create_vrm_dict(before), create_vrm_dict(after), "", float_tolerance
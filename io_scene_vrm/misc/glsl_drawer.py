@@ -201,6 +201,7 @@ class GlslDrawObj:
     materials: Dict[str, MtoonGlsl] = {}
     myinstance: Optional[Any] = None
     draw_objs: List[bpy.types.Object] = []
+    active_count = 0  # len(draw_objs)
     shadowmap_res = 2048
     draw_x_offset = 0.3
     bounding_center = [0, 0, 0]
@@ -618,6 +619,7 @@ class GlslDrawObj:
             for obj in find_export_objects(invisibles, only_selections)
             if obj.type == "MESH"
         ]
+        GlslDrawObj.active_count = len(GlslDrawObj.draw_objs)
         if GlslDrawObj.myinstance is None or GlslDrawObj.draw_func is None:
             GlslDrawObj.myinstance = GlslDrawObj()
         GlslDrawObj.build_scene()
@@ -650,6 +652,7 @@ class GlslDrawObj:
             bpy.app.handlers.depsgraph_update_post.remove(GlslDrawObj.build_mesh_func)
             GlslDrawObj.build_mesh_func = None
         GlslDrawObj.draw_objs = []
+        GlslDrawObj.active_count = 0
         bpy.ops.wm.redraw_timer(type="DRAW", iterations=1)  # Force redraw
 
     # endregion 3Dview drawer
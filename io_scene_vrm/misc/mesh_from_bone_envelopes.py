@@ -1,7 +1,8 @@
 from math import ceil
-from typing import Set
+from typing import List, Set
 
 import bpy
+import numpy
 from mathutils import Vector
 
 from ..importer.blend_model import shader_node_group_import
@@ -39,15 +40,20 @@ class ICYP_OT_MAKE_MESH_FROM_BONE_ENVELOPES(bpy.types.Operator):  # type: ignore
         armature = bpy.context.active_object
         mball = bpy.data.metaballs.new(f"{armature.name}_mball")
         mball.threshold = 0.001
-        is_vrm_humanoid = False
+        is_vrm_humanoid = "title" in armature and self.may_vrm_humanoid
+        skipped_bone_names = frozenset(
+            armature.data.get(s) for s in ("leftEye", "rightEye", "hips")
+        )
+        head_bone_name = armature.data.get("head")
+        # 全ボーン分の位置と半径を集めてから、まとめてメタボールを作る
+        locations: List[List[float]] = []
+        radii: List[float] = []
+        min_rad = mball.resolution
         for bone in armature.data.bones:
             if self.use_selected_bones and bone.select is False:
                 continue
-            if "title" in armature and self.may_vrm_humanoid:  # = is VRM humanoid
-                is_vrm_humanoid = True
-                if bone.name in [
-                    armature.data.get(s) for s in ("leftEye", "rightEye", "hips")
-                ]:
+            if is_vrm_humanoid:
+                if bone.name in skipped_bone_names:
                     continue
                 if bone.name == "root":
                     continue
@@ -55,28 +61,27 @@ class ICYP_OT_MAKE_MESH_FROM_BONE_ENVELOPES(bpy.types.Operator):  # type: ignore
             hrad = bone.head_radius
             tpos = bone.tail_local
             trad = bone.tail_radius
-            if is_vrm_humanoid and armature.data.get("head") == bone.name:
-                elem = mball.elements.new()
-                elem.co = (Vector(hpos) + Vector(tpos)) / 2
-                elem.radius = Vector(Vector(tpos) - Vector(hpos)).length / 2
+            if is_vrm_humanoid and head_bone_name == bone.name:
+                locations.append(list((Vector(hpos) + Vector(tpos)) / 2))
+                radii.append(Vector(Vector(tpos) - Vector(hpos)).length / 2)
                 continue
-            if (
-                Vector(Vector(tpos) - Vector(hpos)).length / self.resolution
-                > self.max_distance_between_mataballs
-            ):
-                self.resolution = ceil(
-                    Vector(Vector(tpos) - Vector(hpos)).length
-                    / self.max_distance_between_mataballs
-                )
+            length = Vector(Vector(tpos) - Vector(hpos)).length
+            if length / self.resolution > self.max_distance_between_mataballs:
+                self.resolution = ceil(length / self.max_distance_between_mataballs)
                 self.resolution = max(2, self.resolution)
-            for i in range(self.resolution):
-                loc = hpos + ((tpos - hpos) / (self.resolution - 1)) * i
-                rad = hrad + ((trad - hrad) / (self.resolution - 1)) * i
-                elem = mball.elements.new()
-                elem.co = loc
-                elem.radius = rad
-            if min([hrad, trad]) < mball.resolution:
-                mball.resolution = min([hrad, trad])
+            # headからtailまでの位置と半径をまとめて計算する
+            head = numpy.array(hpos)
+            ratios = numpy.linspace(0, 1, self.resolution)
+            locations.extend(
+                (head + numpy.outer(ratios, numpy.array(tpos) - head)).tolist()
+            )
+            radii.extend((hrad + ratios * (trad - hrad)).tolist())
+            min_rad = min(min_rad, hrad, trad)
+        for location, radius in zip(locations, radii):
+            elem = mball.elements.new()
+            elem.co = location
+            elem.radius = radius
+        mball.resolution = min_rad
         mobj = bpy.data.objects.new(f"{armature.name}_mesh", mball)
         mobj.location = armature.location
         mobj.rotation_quaternion = armature.rotation_quaternion
@@ -2,9 +2,10 @@ from typing import Optional
 
 import bpy
 
+addon_name = ".".join(__name__.split(".")[:-3])
+
 
 def get_preferences(context: bpy.types.Context) -> Optional[bpy.types.AddonPreferences]:
-    addon_name = ".".join(__name__.split(".")[:-3])
     addon = context.preferences.addons.get(addon_name)
     if addon:
         return addon.preferences
@@ -8,10 +8,14 @@ https://opensource.org/licenses/mit-license.php
 import math
 import struct
 from sys import float_info
-from typing import Any, Dict, List, Optional, Sequence, Union, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union, cast
 
 import bpy
 
+if TYPE_CHECKING:
+    # numpy is only needed for annotations. Keep it out of add-on startup
+    import numpy
+
 
 class Gltf:
     TEXTURE_INPUT_NAMES = [
@@ -95,10 +99,10 @@ class Mesh:
         self.object_id = object_id
         self.material_index: Optional[int] = None
         self.POSITION_accessor: Optional[int] = None
-        self.POSITION: Optional[List[List[float]]] = None
-        self.JOINTS_0: Optional[List[List[int]]] = None
-        self.WEIGHTS_0: Optional[List[List[float]]] = None
-        self.NORMAL: Optional[List[List[float]]] = None
+        self.POSITION: Optional[numpy.ndarray] = None
+        self.JOINTS_0: Optional[numpy.ndarray] = None
+        self.WEIGHTS_0: Optional[numpy.ndarray] = None
+        self.NORMAL: Optional[numpy.ndarray] = None
         self.vert_normal_normalized: Optional[bool] = None
         self.morph_target_point_list_and_accessor_index_dict: Optional[
             Dict[str, List[Any]]
@@ -130,13 +134,13 @@ class HumanBones:
     right_leg_req = ["rightUpperLeg", "rightLowerLeg", "rightFoot"]
     right_arm_req = ["rightUpperArm", "rightLowerArm", "rightHand"]
 
-    requires = [
+    requires = (
         *center_req[:],
         *left_leg_req[:],
         *right_leg_req[:],
         *left_arm_req[:],
         *right_arm_req[:],
-    ]
+    )
 
     left_arm_def = [
         "leftShoulder",
@@ -178,7 +182,7 @@ class HumanBones:
     center_def = ["upperChest", "jaw"]
     left_leg_def = ["leftToes"]
     right_leg_def = ["rightToes"]
-    defines = [
+    defines = (
         "leftEye",
         "rightEye",
         *center_def[:],
@@ -186,7 +190,7 @@ class HumanBones:
         *right_leg_def[:],
         *left_arm_def[:],
         *right_arm_def[:],
-    ]
+    )
     # child:parent
     hierarchy: Dict[str, str] = {
         # 体幹
@@ -9,6 +9,7 @@ https://opensource.org/licenses/mit-license.php
 """
 
 import json
+import mmap
 import os
 import sys
 import tkinter.filedialog as filedialog
@@ -18,7 +19,7 @@ from os.path import dirname
 sys.path.insert(0, dirname(dirname(__file__)))
 
 # pylint: disable=wrong-import-position;
-from io_scene_vrm.importer.vrm_load import parse_glb  # noqa: E402
+from io_scene_vrm.importer.vrm_load import parse_glb_json_only  # noqa: E402
 
 # pylint: enable=wrong-import-position;
 
@@ -31,8 +32,11 @@ def exist_or_makedir(path: str) -> str:
 
 
 model_path = filedialog.askopenfilename(filetypes=[("", "*vrm")])  # type: ignore[no-untyped-call]
-with open(model_path, "rb") as f:
-    vrm_json, binary = parse_glb(f.read())
+# Map the file so that only the pages of the JSON chunk are read
+with open(model_path, "rb") as f, mmap.mmap(
+    f.fileno(), 0, access=mmap.ACCESS_READ
+) as data:
+    vrm_json = parse_glb_json_only(data)
 if messagebox.askyesno(message="write VRM.json?"):
     writedir = exist_or_makedir(model_path)
     writejsonpath = os.path.join(writedir, "vrm.json")
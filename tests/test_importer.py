@@ -1,6 +1,10 @@
+import struct
+from pathlib import Path
 from typing import List
 from unittest import TestCase
 
+import numpy
+
 from io_scene_vrm.importer import vrm_load
 
 
@@ -39,3 +43,153 @@ class TestImporter(TestCase):
                     self.assertEqual(1, len(confirmation_props))
                 else:
                     self.assertEqual(list(), confirmation_props)
+
+    def test_decode_bin(self) -> None:
+        binary = (
+            b"\x00\x00" + struct.pack("<3H", 0, 1, 2) + struct.pack("<4f", 1, 2, 3, 4)
+        )
+        json_data = {
+            "bufferViews": [{"byteOffset": 2}, {"byteOffset": 8}],
+            "accessors": [
+                {"bufferView": 0, "componentType": 5123, "count": 3, "type": "SCALAR"},
+                {"bufferView": 1, "componentType": 5126, "count": 2, "type": "VEC2"},
+                {"componentType": 5126, "count": 1, "type": "VEC3"},
+            ],
+        }
+        self.assertEqual(
+            [[0, 1, 2], [[1.0, 2.0], [3.0, 4.0]], [[0.0, 0.0, 0.0]]],
+            [data.tolist() for data in vrm_load.decode_bin(json_data, binary)],
+        )
+
+    def test_decode_bin_without_buffer_view(self) -> None:
+        json_data = {
+            "bufferViews": [],
+            "accessors": [
+                {"componentType": 5126, "count": 2, "type": "VEC3"},
+                {"componentType": 5125, "count": 3, "type": "SCALAR"},
+                {"componentType": 5126, "count": 0, "type": "VEC2"},
+            ],
+        }
+        decoded_binary = vrm_load.decode_bin(json_data, b"")
+        self.assertEqual(
+            [(2, 3), (3,), (0, 2)], [data.shape for data in decoded_binary]
+        )
+        self.assertEqual(
+            [[[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]], [0, 0, 0], []],
+            [data.tolist() for data in decoded_binary],
+        )
+        # モーフターゲットや古いUniVRMのUV修正の計算にそのまま使える
+        self.assertEqual(
+            [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]],
+            (decoded_binary[0] + [[1, 2, 3], [4, 5, 6]]).tolist(),
+        )
+        self.assertEqual([], (decoded_binary[2] + (0.0, 1.0)).tolist())
+
+    def test_vrm_dict_diff_int(self) -> None:
+        # intは許容誤差に関係なく完全に一致するかを比べる
+        self.assertEqual(
+            [": left is 3 but right is 4"], vrm_load.vrm_dict_diff(3, 4, "", 10.0)
+        )
+        self.assertEqual(
+            ["[1]: left is 9007199254740993 but right is 9007199254740992"],
+            vrm_load.vrm_dict_diff([1, 2 ** 53 + 1], [1, 2 ** 53], "", 1.0),
+        )
+        # floatと混ざったintや、int64に収まらないintも丸めずに比べる
+        self.assertEqual(
+            ["[1]: left is 9007199254740993 but right is 9007199254740992"],
+            vrm_load.vrm_dict_diff([0.5, 2 ** 53 + 1], [0.5, 2 ** 53], "", 0.0),
+        )
+        self.assertEqual(
+            ["[1]: left is 9223372036854775808 but right is 9223372036854775809"],
+            vrm_load.vrm_dict_diff([-1, 2 ** 63], [-1, 2 ** 63 + 1], "", 0.0),
+        )
+        self.assertEqual(
+            [
+                "[0][0]: left is  1.00000000000000000 but right is  1.50000000000000000,"
+                + " error=0.50000000000000000",
+                "[0][1]: left is 1152921504606846977 but right is 1152921504606846976",
+            ],
+            vrm_load.vrm_dict_diff([[1, 2 ** 60 + 1]], [[1.5, 2 ** 60]], "", 0.0),
+        )
+
+    def test_vrm_dict_diff_float_tolerance(self) -> None:
+        # 誤差が許容誤差ちょうどなら差分にしない
+        self.assertEqual([], vrm_load.vrm_dict_diff({"a": 1.0}, {"a": 1.25}, "", 0.25))
+        self.assertEqual(
+            [
+                "[1]: left is  1.50000000000000000 but right is  2.00000000000000000,"
+                + " error=0.50000000000000000"
+            ],
+            vrm_load.vrm_dict_diff([1.0, 1.5, 1], [1.25, 2.0, 1.25], "", 0.25),
+        )
+
+    def test_vrm_dict_diff_length_and_shape(self) -> None:
+        self.assertEqual(
+            [": left length is 2 but right length is 3"],
+            vrm_load.vrm_dict_diff([1, 2], [1, 2, 3], "", 0.0),
+        )
+        self.assertEqual(
+            ["[0]: left length is 2 but right length is 3"],
+            vrm_load.vrm_dict_diff([[1, 2], [3, 4]], [[1, 2, 0], [3, 4]], "", 0.0),
+        )
+        self.assertEqual(
+            ["[1][0]: left is 3 but right is 4"],
+            vrm_load.vrm_dict_diff([[1, 2], [3]], [[1, 2], [4]], "", 0.0),
+        )
+        self.assertEqual(
+            [": left length is 2 but right length is 1"],
+            vrm_load.vrm_dict_diff(numpy.zeros((2, 3)), numpy.zeros((1, 3)), "", 0.0),
+        )
+
+    def test_vrm_dict_diff_ndarray(self) -> None:
+        left = numpy.array([[1.0, 2.0], [3.0, 4.0]], dtype=numpy.float32)
+        self.assertEqual([], vrm_load.vrm_dict_diff(left, left.tolist(), "", 0.0))
+        self.assertEqual(
+            [
+                "[1][0]: left is  3.00000000000000000 but right is  3.50000000000000000,"
+                + " error=0.50000000000000000"
+            ],
+            vrm_load.vrm_dict_diff(left, [[1.0, 2.0], [3.5, 4.0]], "", 0.25),
+        )
+        self.assertEqual(
+            ["[2]: left is 2 but right is 3"],
+            vrm_load.vrm_dict_diff(
+                numpy.array([0, 1, 2], dtype=numpy.uint16),
+                numpy.array([0, 1, 3], dtype=numpy.uint32),
+                "",
+                0.0,
+            ),
+        )
+
+    def test_vrm_dict_diff_keys(self) -> None:
+        self.assertEqual(
+            [": a not in right", ": c not in left"],
+            vrm_load.vrm_dict_diff({"a": 1, "b": 2}, {"b": 2, "c": 3}, "", 0.0),
+        )
+
+    def test_vrm_dict_diff_order(self) -> None:
+        # キーはソート順、listは添字順に差分を出力する
+        self.assertEqual(
+            [
+                "[\"a\"]: left is None but right is <class 'int'>",
+                '["b"][0]: left is 0 but right is 1',
+                '["b"][1]["x"]: left is True but right is False',
+                '["b"][1]["y"]: left is "q" but right is "p"',
+                '["c"][0]: left is  1.00000000000000000 but right is  1.50000000000000000,'
+                + " error=0.50000000000000000",
+            ],
+            vrm_load.vrm_dict_diff(
+                {"b": [0, {"y": "q", "x": True}], "a": None, "c": [1.0, 2.0]},
+                {"c": [1.5, 2.0], "b": [1, {"x": False, "y": "p"}], "a": 0},
+                "",
+                0.0,
+            ),
+        )
+
+    def test_parse_glb_json_only(self) -> None:
+        for vrm_path in sorted((Path(__file__).parent / "vrm").glob("*/*.vrm")):
+            with self.subTest(str(vrm_path)):
+                data = vrm_path.read_bytes()
+                self.assertEqual(
+                    vrm_load.parse_glb(data)[0], vrm_load.parse_glb_json_only(data)
+                )